@@ -1,4 +1,7 @@
+'use strict';
+
 const fs = require('node:fs/promises');
+const { constants: fsConstants } = require('node:fs');
 const path = require('node:path');
 const crypto = require('node:crypto');
 
@@ -6,8 +9,14 @@ const DB_FILE_NAME = 'db.json';
 const BACKUP_DB_DIR_NAME = 'db';
 const BACKUP_DOCUMENTS_DIR_NAME = 'documents';
 const MAX_DOCUMENT_BACKUPS_PER_ID = 20;
+const MAX_CONCURRENT_DOCUMENT_BACKUPS = 4;
 const ALLOWED_COLORS = new Set(['yellow', 'green', 'pink', 'blue', 'orange', 'purple']);
 const ALLOWED_THEMES = new Set(['white']);
+const MAX_NORMALIZATION_CACHE_SIZE = 20000;
+const dbSnapshotCache = new Map();
+const normalizedIsoStringCache = new Map();
+const loadedDBSnapshots = new WeakMap();
+const trustedRecords = new WeakSet();
 
 const DEFAULT_SETTINGS = {
   theme: 'white',
@@ -35,7 +44,22 @@ const EMPTY_DB = {
   readingLog: {},
 };
 
+function rememberBounded(cache, key, value) {
+  if (cache.size >= MAX_NORMALIZATION_CACHE_SIZE) {
+    cache.delete(cache.keys().next().value);
+  }
+  cache.set(key, value);
+  return value;
+}
+
 function normalizeIsoString(value) {
+  if (typeof value === 'string') {
+    const cached = normalizedIsoStringCache.get(value);
+    if (cached !== undefined) {
+      return cached;
+    }
+  }
+
   const iso = String(value ?? '').trim();
   if (!iso) {
     return undefined;
@@ -46,10 +70,15 @@ function normalizeIsoString(value) {
     return undefined;
   }
 
-  return date.toISOString();
+  const normalized = date.toISOString();
+  return typeof value === 'string' ? rememberBounded(normalizedIsoStringCache, value, normalized) : normalized;
 }
 
 function normalizePositiveInt(value, fallback = 0) {
+  if (Number.isSafeInteger(value) && value > 0) {
+    return value;
+  }
+
   const raw = Number(value);
   if (!Number.isFinite(raw)) {
     return Math.max(0, Number(fallback) | 0);
@@ -556,13 +585,45 @@ function sortBackupFileNamesDesc(fileNames = []) {
   });
 }
 
+function deepFreeze(value) {
+  if (value && typeof value === 'object' && !Object.isFrozen(value)) {
+    Object.freeze(value);
+    for (const nested of Object.values(value)) {
+      deepFreeze(nested);
+    }
+  }
+  return value;
+}
+
+// Records of a memoized snapshot were already normalized and are frozen, so a
+// save can reuse every record that a caller did not replace. Newly normalized
+// records are frozen as a private copy: normalizeDocument passes unknown fields
+// through, and nested values there may still belong to the caller.
+function trustSnapshotRecords(db) {
+  for (const collection of ['documents', 'highlights', 'bookmarks', 'collections']) {
+    db[collection] = db[collection].map((record) => {
+      if (trustedRecords.has(record)) {
+        return record;
+      }
+      const trusted = deepFreeze(structuredClone(record));
+      trustedRecords.add(trusted);
+      return trusted;
+    });
+  }
+  deepFreeze(db.readingLog);
+}
+
+function normalizeUntrusted(normalize) {
+  return (record) => (trustedRecords.has(record) ? record : normalize(record));
+}
+
 function normalizeDBShape(parsed) {
   const documents = (Array.isArray(parsed?.documents) ? parsed.documents : [])
-    .map(normalizeDocument)
+    .map(normalizeUntrusted(normalizeDocument))
     .filter((doc) => doc.id && doc.title && doc.filePath);
   const documentTitleMap = new Map(documents.map((doc) => [doc.id, doc.title]));
   const highlights = (Array.isArray(parsed?.highlights) ? parsed.highlights : [])
-    .map(normalizeHighlight)
+    .map(normalizeUntrusted(normalizeHighlight))
     .filter((highlight) => highlight.id && highlight.documentId)
     .map((highlight) => {
       if (highlight.documentTitle) {
@@ -582,10 +643,10 @@ function normalizeDBShape(parsed) {
     documents,
     highlights,
     bookmarks: (Array.isArray(parsed?.bookmarks) ? parsed.bookmarks : [])
-      .map(normalizeBookmark)
+      .map(normalizeUntrusted(normalizeBookmark))
       .filter((bookmark) => bookmark.id && bookmark.documentId),
     collections: (Array.isArray(parsed?.collections) ? parsed.collections : [])
-      .map(normalizeCollection)
+      .map(normalizeUntrusted(normalizeCollection))
       .filter((collection) => collection.id && collection.name),
     settings: normalizeSettings(parsed?.settings),
     readingLog: normalizeReadingLog(parsed?.readingLog),
@@ -601,11 +662,25 @@ async function fileExists(filePath) {
   }
 }
 
-async function atomicWriteJson(filePath, value) {
-  const tempFilePath = `${filePath}.${process.pid}.${Date.now()}.tmp`;
-  const json = JSON.stringify(value, null, 2);
-  await fs.writeFile(tempFilePath, json, 'utf8');
+// Returns the stamp of the written file, taken from the temp file's handle:
+// rename keeps ino, mtime and size, so the stamp describes exactly these bytes
+// even if another write replaces the target right after the rename.
+async function atomicWriteFile(filePath, contents) {
+  const tempFilePath = `${filePath}.${process.pid}.${Date.now()}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+  const handle = await fs.open(tempFilePath, 'w');
+  let stats;
+  try {
+    await handle.writeFile(contents, 'utf8');
+    stats = await handle.stat({ bigint: true });
+  } finally {
+    await handle.close();
+  }
   await fs.rename(tempFilePath, filePath);
+  return formatDBFileStamp(stats);
+}
+
+async function atomicWriteJson(filePath, value) {
+  return atomicWriteFile(filePath, JSON.stringify(value, null, 2));
 }
 
 async function pruneDocumentBackups(documentBackupDir, maxSnapshots = MAX_DOCUMENT_BACKUPS_PER_ID) {
@@ -631,7 +706,7 @@ async function writeDocumentBackup(storagePaths, db, documentId, reason = 'snaps
     return null;
   }
 
-  const document = db.documents.find((item) => item.id === id) || null;
+  const document = findById(db, 'documents', id);
   const highlights = db.highlights.filter((item) => item.documentId === id);
   const bookmarks = db.bookmarks.filter((item) => item.documentId === id);
 
@@ -659,10 +734,11 @@ async function writeDocumentBackup(storagePaths, db, documentId, reason = 'snaps
   await atomicWriteJson(payloadPath, payload);
 
   const candidatePdfPath = document?.filePath || path.join(storagePaths.documentsDir, `${id}.pdf`);
-  const hasPdfSource = await fileExists(candidatePdfPath);
-  if (hasPdfSource) {
-    await fs.copyFile(candidatePdfPath, path.join(documentBackupDir, `${baseName}.pdf`));
-  }
+  await fs.copyFile(candidatePdfPath, path.join(documentBackupDir, `${baseName}.pdf`)).catch((error) => {
+    if (error?.code !== 'ENOENT') {
+      throw error;
+    }
+  });
 
   await pruneDocumentBackups(documentBackupDir);
   return {
@@ -680,46 +756,23 @@ async function writeDocumentBackupSafe(storagePaths, db, documentId, reason = 's
   }
 }
 
-async function readLatestDocumentBackup(storagePaths, documentId) {
-  const id = String(documentId ?? '').trim();
-  if (!id) {
-    return null;
-  }
-
-  const documentBackupDir = path.join(storagePaths.backupDir, BACKUP_DOCUMENTS_DIR_NAME, id);
-  const entries = await fs.readdir(documentBackupDir).catch(() => []);
-  const jsonFiles = sortBackupFileNamesDesc(
-    entries.filter((entry) => String(entry).toLowerCase().endsWith('.json')),
-  );
-
-  for (const jsonFileName of jsonFiles) {
-    const payloadPath = path.join(documentBackupDir, jsonFileName);
-    const baseName = jsonFileName.slice(0, -5);
-    const pdfPath = path.join(documentBackupDir, `${baseName}.pdf`);
-
-    try {
-      const raw = await fs.readFile(payloadPath, 'utf8');
-      const payload = JSON.parse(raw);
-      if (!payload || typeof payload !== 'object') {
-        continue;
-      }
-      return {
-        payloadPath,
-        payload,
-        pdfPath: (await fileExists(pdfPath)) ? pdfPath : undefined,
-      };
-    } catch {
-      // Skip broken snapshot and continue to previous backup.
+// Each backup may copy a whole PDF, so bulk operations back up only a few
+// documents at a time.
+async function writeDocumentBackupsSafe(storagePaths, db, documentIds, reason) {
+  const queue = [...documentIds];
+  const worker = async () => {
+    while (queue.length > 0) {
+      await writeDocumentBackupSafe(storagePaths, db, queue.shift(), reason);
     }
-  }
-
-  return null;
+  };
+  const workerCount = Math.min(MAX_CONCURRENT_DOCUMENT_BACKUPS, queue.length);
+  await Promise.all(Array.from({ length: workerCount }, worker));
 }
 
-async function readLatestDocumentBackupWithPdf(storagePaths, documentId) {
+async function* iterateDocumentBackups(storagePaths, documentId, { shouldRead = () => true } = {}) {
   const id = String(documentId ?? '').trim();
   if (!id) {
-    return null;
+    return;
   }
 
   const documentBackupDir = path.join(storagePaths.backupDir, BACKUP_DOCUMENTS_DIR_NAME, id);
@@ -732,141 +785,65 @@ async function readLatestDocumentBackupWithPdf(storagePaths, documentId) {
     const payloadPath = path.join(documentBackupDir, jsonFileName);
     const baseName = jsonFileName.slice(0, -5);
     const pdfPath = path.join(documentBackupDir, `${baseName}.pdf`);
-    if (!(await fileExists(pdfPath))) {
+    const entry = { payloadPath, pdfPath: (await fileExists(pdfPath)) ? pdfPath : undefined };
+    if (!shouldRead(entry)) {
       continue;
     }
 
+    let payload;
     try {
-      const raw = await fs.readFile(payloadPath, 'utf8');
-      const payload = JSON.parse(raw);
-      if (!payload || typeof payload !== 'object') {
-        continue;
-      }
-      return {
-        payloadPath,
-        payload,
-        pdfPath,
-      };
+      payload = JSON.parse(await fs.readFile(payloadPath, 'utf8'));
     } catch {
       // Skip broken snapshot and continue to previous backup.
+      continue;
     }
-  }
-
-  return null;
-}
-
-async function readLatestDocumentBackupWithDocument(storagePaths, documentId) {
-  const id = String(documentId ?? '').trim();
-  if (!id) {
-    return null;
-  }
-
-  const documentBackupDir = path.join(storagePaths.backupDir, BACKUP_DOCUMENTS_DIR_NAME, id);
-  const entries = await fs.readdir(documentBackupDir).catch(() => []);
-  const jsonFiles = sortBackupFileNamesDesc(
-    entries.filter((entry) => String(entry).toLowerCase().endsWith('.json')),
-  );
-
-  for (const jsonFileName of jsonFiles) {
-    const payloadPath = path.join(documentBackupDir, jsonFileName);
-    const baseName = jsonFileName.slice(0, -5);
-    const pdfPath = path.join(documentBackupDir, `${baseName}.pdf`);
-
-    try {
-      const raw = await fs.readFile(payloadPath, 'utf8');
-      const payload = JSON.parse(raw);
-      if (!payload || typeof payload !== 'object' || !payload.document) {
-        continue;
-      }
-      return {
-        payloadPath,
-        payload,
-        pdfPath: (await fileExists(pdfPath)) ? pdfPath : undefined,
-      };
-    } catch {
-      // Skip broken snapshot and continue to previous backup.
+    if (!payload || typeof payload !== 'object') {
+      continue;
     }
-  }
-
-  return null;
-}
 
-async function readLatestDocumentBackupWithHighlights(storagePaths, documentId) {
-  const id = String(documentId ?? '').trim();
-  if (!id) {
-    return null;
+    yield { ...entry, payload };
   }
-
-  const documentBackupDir = path.join(storagePaths.backupDir, BACKUP_DOCUMENTS_DIR_NAME, id);
-  const entries = await fs.readdir(documentBackupDir).catch(() => []);
-  const jsonFiles = sortBackupFileNamesDesc(
-    entries.filter((entry) => String(entry).toLowerCase().endsWith('.json')),
-  );
-
-  for (const jsonFileName of jsonFiles) {
-    const payloadPath = path.join(documentBackupDir, jsonFileName);
-    const baseName = jsonFileName.slice(0, -5);
-    const pdfPath = path.join(documentBackupDir, `${baseName}.pdf`);
-
-    try {
-      const raw = await fs.readFile(payloadPath, 'utf8');
-      const payload = JSON.parse(raw);
-      if (!payload || typeof payload !== 'object') {
-        continue;
-      }
-      if (!Array.isArray(payload.highlights) || payload.highlights.length === 0) {
-        continue;
-      }
-      return {
-        payloadPath,
-        payload,
-        pdfPath: (await fileExists(pdfPath)) ? pdfPath : undefined,
-      };
-    } catch {
-      // Skip broken snapshot and continue to previous backup.
-    }
-  }
-
-  return null;
 }
 
-async function readLatestDocumentBackupWithBookmarks(storagePaths, documentId) {
-  const id = String(documentId ?? '').trim();
-  if (!id) {
-    return null;
-  }
-
-  const documentBackupDir = path.join(storagePaths.backupDir, BACKUP_DOCUMENTS_DIR_NAME, id);
-  const entries = await fs.readdir(documentBackupDir).catch(() => []);
-  const jsonFiles = sortBackupFileNamesDesc(
-    entries.filter((entry) => String(entry).toLowerCase().endsWith('.json')),
-  );
+const DOCUMENT_BACKUP_SOURCE_MATCHERS = {
+  withDocument: (snapshot) => Boolean(snapshot.payload.document),
+  withHighlights: (snapshot) =>
+    Array.isArray(snapshot.payload.highlights) && snapshot.payload.highlights.length > 0,
+  withBookmarks: (snapshot) =>
+    Array.isArray(snapshot.payload.bookmarks) && snapshot.payload.bookmarks.length > 0,
+  withPdf: (snapshot) => Boolean(snapshot.pdfPath),
+};
 
-  for (const jsonFileName of jsonFiles) {
-    const payloadPath = path.join(documentBackupDir, jsonFileName);
-    const baseName = jsonFileName.slice(0, -5);
-    const pdfPath = path.join(documentBackupDir, `${baseName}.pdf`);
+// One newest-first walk finds every snapshot a restore can draw from. Once only
+// a PDF is still missing, snapshots without one are skipped before parsing.
+async function findDocumentBackupSources(storagePaths, documentId) {
+  const sources = {
+    latest: null,
+    withDocument: null,
+    withHighlights: null,
+    withBookmarks: null,
+    withPdf: null,
+  };
+  const onlyPdfMissing = () =>
+    Object.entries(sources).every(([key, snapshot]) => key === 'withPdf' || snapshot);
+  const snapshots = iterateDocumentBackups(storagePaths, documentId, {
+    shouldRead: (entry) => Boolean(entry.pdfPath) || !onlyPdfMissing(),
+  });
 
-    try {
-      const raw = await fs.readFile(payloadPath, 'utf8');
-      const payload = JSON.parse(raw);
-      if (!payload || typeof payload !== 'object') {
-        continue;
-      }
-      if (!Array.isArray(payload.bookmarks) || payload.bookmarks.length === 0) {
-        continue;
+  for await (const snapshot of snapshots) {
+    if (!sources.latest) {
+      sources.latest = snapshot;
+    }
+    for (const [key, matches] of Object.entries(DOCUMENT_BACKUP_SOURCE_MATCHERS)) {
+      if (!sources[key] && matches(snapshot)) {
+        sources[key] = snapshot;
       }
-      return {
-        payloadPath,
-        payload,
-        pdfPath: (await fileExists(pdfPath)) ? pdfPath : undefined,
-      };
-    } catch {
-      // Skip broken snapshot and continue to previous backup.
+    }
+    if (Object.values(sources).every(Boolean)) {
+      break;
     }
   }
-
-  return null;
+  return sources;
 }
 
 async function ensureStorage(userDataPath) {
@@ -886,9 +863,13 @@ async function ensureStorage(userDataPath) {
     fs.mkdir(backupDbDir, { recursive: true }),
   ]);
 
-  if (!(await fileExists(dbPath))) {
-    await atomicWriteJson(dbPath, EMPTY_DB);
-  }
+  await fs
+    .writeFile(dbPath, JSON.stringify(EMPTY_DB, null, 2), { encoding: 'utf8', flag: 'wx' })
+    .catch((error) => {
+      if (error?.code !== 'EEXIST') {
+        throw error;
+      }
+    });
 
   return {
     userDataPath,
@@ -899,8 +880,54 @@ async function ensureStorage(userDataPath) {
   };
 }
 
-async function loadDB(storagePaths) {
-  const raw = await fs.readFile(storagePaths.dbPath, 'utf8');
+function formatDBFileStamp(stats) {
+  return `${stats.ino}:${stats.mtimeNs}:${stats.size}`;
+}
+
+async function readDBFileStamp(dbPath) {
+  try {
+    return formatDBFileStamp(await fs.stat(dbPath, { bigint: true }));
+  } catch {
+    return null;
+  }
+}
+
+// Stamp and contents come from one open handle, so a rename landing between
+// the two can never pair a fresh stamp with stale bytes.
+async function readDBFile(dbPath) {
+  const handle = await fs.open(dbPath, 'r');
+  try {
+    const stats = await handle.stat({ bigint: true });
+    const raw = await handle.readFile('utf8');
+    return { stamp: formatDBFileStamp(stats), raw };
+  } finally {
+    await handle.close();
+  }
+}
+
+function rememberDBSnapshot(dbPath, stamp, db, json = null) {
+  if (!stamp) {
+    dbSnapshotCache.delete(dbPath);
+    return { stamp: null, db, json: null, countMaps: null, idIndexes: {} };
+  }
+
+  trustSnapshotRecords(db);
+  const snapshot = { stamp, db, json, countMaps: null, idIndexes: {} };
+  dbSnapshotCache.set(dbPath, snapshot);
+  loadedDBSnapshots.set(db, snapshot);
+  return snapshot;
+}
+
+// Normalized db.json is memoized by file stamp: normalizeDBShape runs the whole
+// text-repair pipeline over every highlight, which dominates each IPC call.
+async function loadDBSnapshot(storagePaths) {
+  const stamp = await readDBFileStamp(storagePaths.dbPath);
+  const cached = dbSnapshotCache.get(storagePaths.dbPath);
+  if (stamp && cached?.stamp === stamp) {
+    return cached;
+  }
+
+  const { stamp: readStamp, raw } = await readDBFile(storagePaths.dbPath);
 
   try {
     const parsed = JSON.parse(raw);
@@ -908,12 +935,12 @@ async function loadDB(storagePaths) {
       throw new Error('Некорректный формат базы данных');
     }
 
-    return normalizeDBShape(parsed);
+    return rememberDBSnapshot(storagePaths.dbPath, readStamp, normalizeDBShape(parsed), raw);
   } catch {
     const corruptPath = `${storagePaths.dbPath}.corrupt.${Date.now()}`;
     await fs.writeFile(corruptPath, raw, 'utf8');
     await atomicWriteJson(storagePaths.dbPath, EMPTY_DB);
-    return {
+    return rememberDBSnapshot(storagePaths.dbPath, null, {
       ...EMPTY_DB,
       settings: {
         ...DEFAULT_SETTINGS,
@@ -921,28 +948,101 @@ async function loadDB(storagePaths) {
         savedHighlightViews: [...DEFAULT_SETTINGS.savedHighlightViews],
         savedHighlightQueries: [...DEFAULT_SETTINGS.savedHighlightQueries],
       },
-    };
+    });
+  }
+}
+
+// The returned containers (collection arrays, settings, readingLog) are fresh
+// and can be reshaped freely, but the records and readingLog entries inside are
+// frozen snapshot values: replace one with an edited copy instead of writing to it.
+// saveDB normalizes replaced and added records again.
+async function loadDB(storagePaths) {
+  const snapshot = await loadDBSnapshot(storagePaths);
+  const db = {
+    documents: [...snapshot.db.documents],
+    highlights: [...snapshot.db.highlights],
+    bookmarks: [...snapshot.db.bookmarks],
+    collections: [...snapshot.db.collections],
+    settings: structuredClone(snapshot.db.settings),
+    readingLog: { ...snapshot.db.readingLog },
+  };
+  loadedDBSnapshots.set(db, snapshot);
+  return db;
+}
+
+function getSnapshotIdIndex(snapshot, collection) {
+  if (!snapshot.idIndexes[collection]) {
+    const index = new Map();
+    snapshot.db[collection].forEach((item, position) => {
+      if (!index.has(item.id)) {
+        index.set(item.id, position);
+      }
+    });
+    snapshot.idIndexes[collection] = index;
   }
+  return snapshot.idIndexes[collection];
+}
+
+// Clones from loadDB keep the snapshot order until they are reshaped, so the
+// snapshot id index is tried first and verified before falling back to a scan.
+function findIndexById(db, collection, id) {
+  const items = db[collection];
+  const snapshot = loadedDBSnapshots.get(db);
+  if (snapshot) {
+    const index = getSnapshotIdIndex(snapshot, collection).get(id);
+    if (index !== undefined && items[index]?.id === id) {
+      return index;
+    }
+  }
+  return items.findIndex((item) => item.id === id);
+}
+
+function findById(db, collection, id) {
+  const index = findIndexById(db, collection, id);
+  return index >= 0 ? db[collection][index] : null;
 }
 
 async function saveDB(storagePaths, db) {
-  await atomicWriteJson(storagePaths.dbPath, normalizeDBShape(db));
+  const normalized = normalizeDBShape(db);
+  // db.json is rewritten on every mutation; compact output is ~40% smaller and faster to encode.
+  const json = JSON.stringify(normalized);
+  // The cached stamp comes from the handle that wrote or read those bytes, so a
+  // match with the file on disk means db.json still holds exactly this json.
+  const cached = dbSnapshotCache.get(storagePaths.dbPath);
+  if (cached?.json === json && cached.stamp === (await readDBFileStamp(storagePaths.dbPath))) {
+    return;
+  }
+
+  const stamp = await atomicWriteFile(storagePaths.dbPath, json);
+  rememberDBSnapshot(storagePaths.dbPath, stamp, normalized, json);
 }
 
-function buildHighlightsCountMap(highlights) {
+function buildDocumentCountMap(items) {
   const map = new Map();
-  for (const highlight of highlights) {
-    map.set(highlight.documentId, (map.get(highlight.documentId) ?? 0) + 1);
+  for (const { documentId } of items) {
+    map.set(documentId, (map.get(documentId) ?? 0) + 1);
   }
   return map;
 }
 
-function buildBookmarksCountMap(bookmarks) {
-  const map = new Map();
-  for (const bookmark of bookmarks) {
-    map.set(bookmark.documentId, (map.get(bookmark.documentId) ?? 0) + 1);
+function countDocumentItems(items, documentId) {
+  let count = 0;
+  for (const item of items) {
+    if (item.documentId === documentId) {
+      count += 1;
+    }
   }
-  return map;
+  return count;
+}
+
+function getSnapshotCountMaps(snapshot) {
+  if (!snapshot.countMaps) {
+    snapshot.countMaps = {
+      highlights: buildDocumentCountMap(snapshot.db.highlights),
+      bookmarks: buildDocumentCountMap(snapshot.db.bookmarks),
+    };
+  }
+  return snapshot.countMaps;
 }
 
 function enrichDocument(doc, countMap, bookmarkMap) {
@@ -954,40 +1054,40 @@ function enrichDocument(doc, countMap, bookmarkMap) {
 }
 
 function sortDocumentsForLibrary(documents) {
-  return [...documents].sort((a, b) => {
-    if (a.isPinned !== b.isPinned) {
-      return a.isPinned ? -1 : 1;
-    }
-
-    const aCreatedAt = new Date(a.createdAt).valueOf();
-    const bCreatedAt = new Date(b.createdAt).valueOf();
-    const aLastOpenedAt = a.lastOpenedAt ? new Date(a.lastOpenedAt).valueOf() : 0;
-    const bLastOpenedAt = b.lastOpenedAt ? new Date(b.lastOpenedAt).valueOf() : 0;
-    const aLast = Math.max(aCreatedAt, aLastOpenedAt);
-    const bLast = Math.max(bCreatedAt, bLastOpenedAt);
-    return bLast - aLast;
-  });
+  return documents
+    .map((doc) => ({
+      doc,
+      lastActivityTs: Math.max(
+        new Date(doc.createdAt).valueOf(),
+        doc.lastOpenedAt ? new Date(doc.lastOpenedAt).valueOf() : 0,
+      ),
+    }))
+    .sort((a, b) => {
+      if (a.doc.isPinned !== b.doc.isPinned) {
+        return a.doc.isPinned ? -1 : 1;
+      }
+      return b.lastActivityTs - a.lastActivityTs;
+    })
+    .map(({ doc }) => doc);
 }
 
 async function listDocuments(storagePaths) {
-  const db = await loadDB(storagePaths);
-  const countMap = buildHighlightsCountMap(db.highlights);
-  const bookmarkMap = buildBookmarksCountMap(db.bookmarks);
+  const snapshot = await loadDBSnapshot(storagePaths);
+  const { highlights: countMap, bookmarks: bookmarkMap } = getSnapshotCountMaps(snapshot);
 
   return sortDocumentsForLibrary(
-    db.documents.map((doc) => enrichDocument(doc, countMap, bookmarkMap)),
+    snapshot.db.documents.map((doc) => enrichDocument(doc, countMap, bookmarkMap)),
   );
 }
 
 async function getDocumentById(storagePaths, documentId) {
-  const db = await loadDB(storagePaths);
-  const doc = db.documents.find((item) => item.id === String(documentId));
+  const snapshot = await loadDBSnapshot(storagePaths);
+  const doc = findById(snapshot.db, 'documents', String(documentId));
   if (!doc) {
     return null;
   }
 
-  const countMap = buildHighlightsCountMap(db.highlights);
-  const bookmarkMap = buildBookmarksCountMap(db.bookmarks);
+  const { highlights: countMap, bookmarks: bookmarkMap } = getSnapshotCountMaps(snapshot);
   return enrichDocument(doc, countMap, bookmarkMap);
 }
 
@@ -1024,35 +1124,39 @@ function filterHighlights(highlights, options = {}) {
   return filtered;
 }
 
-function sortHighlights(highlights) {
-  return [...highlights].sort((a, b) => {
-    if (a.pageIndex === b.pageIndex) {
-      return new Date(a.createdAt).valueOf() - new Date(b.createdAt).valueOf();
-    }
-    return a.pageIndex - b.pageIndex;
-  });
+function withCreatedTimestamps(items) {
+  return items.map((item) => ({ item, createdTs: new Date(item.createdAt).valueOf() }));
 }
 
+function sortByPageAndCreatedAt(items) {
+  return withCreatedTimestamps(items)
+    .sort((a, b) => a.item.pageIndex - b.item.pageIndex || a.createdTs - b.createdTs)
+    .map(({ item }) => item);
+}
+
+// Snapshot records are frozen and every listing builds a fresh array, so the
+// results can share records without a defensive copy; IPC replies are
+// serialized by Electron anyway.
 async function listHighlights(storagePaths, documentId, options = {}) {
-  const db = await loadDB(storagePaths);
+  const { db } = await loadDBSnapshot(storagePaths);
 
   const filtered = filterHighlights(db.highlights, {
     ...options,
     documentId,
   });
 
-  return sortHighlights(filtered);
+  return sortByPageAndCreatedAt(filtered);
 }
 
 async function listAllHighlights(storagePaths, options = {}) {
-  const db = await loadDB(storagePaths);
-  return sortHighlights(filterHighlights(db.highlights, options));
+  const { db } = await loadDBSnapshot(storagePaths);
+  return sortByPageAndCreatedAt(filterHighlights(db.highlights, options));
 }
 
 async function upsertDocument(storagePaths, document) {
   const db = await loadDB(storagePaths);
   const normalized = normalizeDocument(document);
-  const index = db.documents.findIndex((item) => item.id === normalized.id);
+  const index = findIndexById(db, 'documents', normalized.id);
 
   if (index >= 0) {
     const existing = db.documents[index];
@@ -1076,7 +1180,7 @@ async function updateDocumentMeta(storagePaths, documentId, patch = {}) {
   }
 
   const db = await loadDB(storagePaths);
-  const index = db.documents.findIndex((doc) => doc.id === id);
+  const index = findIndexById(db, 'documents', id);
   if (index < 0) {
     throw new Error('Документ не найден.');
   }
@@ -1117,7 +1221,7 @@ async function updateDocumentReadingState(storagePaths, documentId, readingState
   }
 
   const db = await loadDB(storagePaths);
-  const index = db.documents.findIndex((doc) => doc.id === id);
+  const index = findIndexById(db, 'documents', id);
   if (index < 0) {
     throw new Error('Документ не найден.');
   }
@@ -1193,7 +1297,7 @@ async function resetDocumentReadingState(storagePaths, documentId) {
   }
 
   const db = await loadDB(storagePaths);
-  const index = db.documents.findIndex((doc) => doc.id === id);
+  const index = findIndexById(db, 'documents', id);
   if (index < 0) {
     throw new Error('Документ не найден.');
   }
@@ -1218,7 +1322,7 @@ async function addHighlight(storagePaths, highlight) {
   const normalizedHighlight = normalizeHighlight(highlight);
 
   if (!normalizedHighlight.documentTitle) {
-    const linkedDocument = db.documents.find((document) => document.id === normalizedHighlight.documentId);
+    const linkedDocument = findById(db, 'documents', normalizedHighlight.documentId);
     if (linkedDocument?.title) {
       normalizedHighlight.documentTitle = linkedDocument.title;
     }
@@ -1242,7 +1346,7 @@ async function addHighlight(storagePaths, highlight) {
 async function updateHighlight(storagePaths, highlightId, patch) {
   const db = await loadDB(storagePaths);
   const id = String(highlightId ?? '');
-  const index = db.highlights.findIndex((item) => item.id === id);
+  const index = findIndexById(db, 'highlights', id);
 
   if (index < 0) {
     throw new Error('Выделение не найдено.');
@@ -1283,7 +1387,7 @@ async function updateHighlight(storagePaths, highlightId, patch) {
   if (!merged.documentTitle) {
     merged.documentTitle =
       existing.documentTitle ||
-      db.documents.find((document) => document.id === existing.documentId)?.title ||
+      findById(db, 'documents', existing.documentId)?.title ||
       undefined;
   }
 
@@ -1312,9 +1416,7 @@ async function deleteHighlightsByIds(storagePaths, highlightIds = []) {
         .map((item) => item.documentId),
     ),
   ];
-  for (const documentId of affectedDocumentIds) {
-    await writeDocumentBackupSafe(storagePaths, db, documentId, 'before-highlight-delete');
-  }
+  await writeDocumentBackupsSafe(storagePaths, db, affectedDocumentIds, 'before-highlight-delete');
   const nextHighlights = db.highlights.filter((item) => !idSet.has(item.id));
   const deletedCount = db.highlights.length - nextHighlights.length;
 
@@ -1328,10 +1430,8 @@ async function deleteHighlightsByIds(storagePaths, highlightIds = []) {
 }
 
 async function listBookmarks(storagePaths, documentId) {
-  const db = await loadDB(storagePaths);
-  return db.bookmarks
-    .filter((item) => item.documentId === String(documentId))
-    .sort((a, b) => a.pageIndex - b.pageIndex || new Date(a.createdAt).valueOf() - new Date(b.createdAt).valueOf());
+  const { db } = await loadDBSnapshot(storagePaths);
+  return sortByPageAndCreatedAt(db.bookmarks.filter((item) => item.documentId === String(documentId)));
 }
 
 async function addBookmark(storagePaths, bookmark) {
@@ -1350,7 +1450,7 @@ async function addBookmark(storagePaths, bookmark) {
 async function updateBookmark(storagePaths, bookmarkId, patch = {}) {
   const db = await loadDB(storagePaths);
   const id = String(bookmarkId ?? '');
-  const index = db.bookmarks.findIndex((bookmark) => bookmark.id === id);
+  const index = findIndexById(db, 'bookmarks', id);
   if (index < 0) {
     throw new Error('Закладка не найдена.');
   }
@@ -1373,7 +1473,7 @@ async function updateBookmark(storagePaths, bookmarkId, patch = {}) {
 async function deleteBookmark(storagePaths, bookmarkId) {
   const id = String(bookmarkId ?? '');
   const db = await loadDB(storagePaths);
-  const target = db.bookmarks.find((bookmark) => bookmark.id === id);
+  const target = findById(db, 'bookmarks', id);
   if (target?.documentId) {
     await writeDocumentBackupSafe(storagePaths, db, target.documentId, 'before-bookmark-delete');
   }
@@ -1402,9 +1502,7 @@ async function deleteBookmarksByIds(storagePaths, bookmarkIds = []) {
         .map((bookmark) => bookmark.documentId),
     ),
   ];
-  for (const documentId of affectedDocumentIds) {
-    await writeDocumentBackupSafe(storagePaths, db, documentId, 'before-bookmark-delete-many');
-  }
+  await writeDocumentBackupsSafe(storagePaths, db, affectedDocumentIds, 'before-bookmark-delete-many');
   const nextBookmarks = db.bookmarks.filter((bookmark) => !idSet.has(bookmark.id));
   const deletedCount = db.bookmarks.length - nextBookmarks.length;
 
@@ -1418,10 +1516,10 @@ async function deleteBookmarksByIds(storagePaths, bookmarkIds = []) {
 }
 
 async function listCollections(storagePaths) {
-  const db = await loadDB(storagePaths);
-  return [...db.collections].sort(
-    (a, b) => new Date(a.createdAt).valueOf() - new Date(b.createdAt).valueOf(),
-  );
+  const { db } = await loadDBSnapshot(storagePaths);
+  return withCreatedTimestamps(db.collections)
+    .sort((a, b) => a.createdTs - b.createdTs)
+    .map(({ item }) => item);
 }
 
 async function createCollection(storagePaths, input) {
@@ -1453,7 +1551,7 @@ async function updateCollection(storagePaths, collectionId, patch = {}) {
   }
 
   const db = await loadDB(storagePaths);
-  const index = db.collections.findIndex((collection) => collection.id === id);
+  const index = findIndexById(db, 'collections', id);
   if (index < 0) {
     throw new Error('Коллекция не найдена.');
   }
@@ -1504,7 +1602,7 @@ async function deleteCollection(storagePaths, collectionId) {
 }
 
 async function getSettings(storagePaths) {
-  const db = await loadDB(storagePaths);
+  const { db } = await loadDBSnapshot(storagePaths);
   return normalizeSettings(db.settings);
 }
 
@@ -1523,7 +1621,7 @@ async function updateSettings(storagePaths, patch = {}) {
 }
 
 async function getReadingOverview(storagePaths) {
-  const db = await loadDB(storagePaths);
+  const { db } = await loadDBSnapshot(storagePaths);
   return {
     readingLog: normalizeReadingLog(db.readingLog),
     settings: normalizeSettings(db.settings),
@@ -1533,7 +1631,7 @@ async function getReadingOverview(storagePaths) {
 async function deleteDocument(storagePaths, documentId) {
   const id = String(documentId ?? '');
   const db = await loadDB(storagePaths);
-  const index = db.documents.findIndex((item) => item.id === id);
+  const index = findIndexById(db, 'documents', id);
 
   if (index < 0) {
     return { deleted: false };
@@ -1542,8 +1640,8 @@ async function deleteDocument(storagePaths, documentId) {
   await writeDocumentBackupSafe(storagePaths, db, id, 'before-document-delete');
 
   const [removedDocument] = db.documents.splice(index, 1);
-  const detachedHighlightsCount = db.highlights.filter((item) => item.documentId === id).length;
-  const detachedBookmarksCount = db.bookmarks.filter((item) => item.documentId === id).length;
+  const detachedHighlightsCount = countDocumentItems(db.highlights, id);
+  const detachedBookmarksCount = countDocumentItems(db.bookmarks, id);
 
   if (removedDocument?.title && detachedHighlightsCount > 0) {
     db.highlights = db.highlights.map((item) => {
@@ -1584,7 +1682,8 @@ async function restoreDocumentFromBackup(storagePaths, documentId, options = {})
     throw new Error('Не передан идентификатор документа.');
   }
 
-  const latest = await readLatestDocumentBackup(storagePaths, id);
+  const sources = await findDocumentBackupSources(storagePaths, id);
+  const { latest } = sources;
   if (!latest) {
     return {
       restored: false,
@@ -1594,7 +1693,7 @@ async function restoreDocumentFromBackup(storagePaths, documentId, options = {})
   }
 
   let snapshotForRestore = latest;
-  let payload =
+  const payload =
     snapshotForRestore.payload && typeof snapshotForRestore.payload === 'object'
       ? snapshotForRestore.payload
       : {};
@@ -1602,27 +1701,18 @@ async function restoreDocumentFromBackup(storagePaths, documentId, options = {})
   let backupHighlights = Array.isArray(payload.highlights) ? payload.highlights : [];
   let backupBookmarks = Array.isArray(payload.bookmarks) ? payload.bookmarks : [];
 
-  if (!backupDocument) {
-    const withDocument = await readLatestDocumentBackupWithDocument(storagePaths, id);
-    if (withDocument?.payload?.document) {
-      backupDocument = withDocument.payload.document;
-    }
+  if (!backupDocument && sources.withDocument) {
+    backupDocument = sources.withDocument.payload.document;
   }
-  if (backupHighlights.length === 0) {
-    const withHighlights = await readLatestDocumentBackupWithHighlights(storagePaths, id);
-    if (Array.isArray(withHighlights?.payload?.highlights) && withHighlights.payload.highlights.length > 0) {
-      backupHighlights = withHighlights.payload.highlights;
-    }
+  if (backupHighlights.length === 0 && sources.withHighlights) {
+    backupHighlights = sources.withHighlights.payload.highlights;
   }
-  if (backupBookmarks.length === 0) {
-    const withBookmarks = await readLatestDocumentBackupWithBookmarks(storagePaths, id);
-    if (Array.isArray(withBookmarks?.payload?.bookmarks) && withBookmarks.payload.bookmarks.length > 0) {
-      backupBookmarks = withBookmarks.payload.bookmarks;
-    }
+  if (backupBookmarks.length === 0 && sources.withBookmarks) {
+    backupBookmarks = sources.withBookmarks.payload.bookmarks;
   }
 
   const db = await loadDB(storagePaths);
-  const existingDocument = db.documents.find((item) => item.id === id) || null;
+  const existingDocument = findById(db, 'documents', id);
 
   const fallbackTitle =
     normalizeText(backupDocument?.title) ||
@@ -1633,23 +1723,24 @@ async function restoreDocumentFromBackup(storagePaths, documentId, options = {})
     String(existingDocument?.filePath || backupDocument?.filePath || '').trim() ||
     path.join(storagePaths.documentsDir, `${id}.pdf`);
 
+  // The exclusive copy doubles as the existence check: an existing PDF is kept.
   let restoredFile = false;
-  const needsPdfRestore = !(await fileExists(destinationPdfPath));
-  let snapshotForPdf = snapshotForRestore;
-  if (needsPdfRestore && !snapshotForPdf.pdfPath) {
-    snapshotForPdf = (await readLatestDocumentBackupWithPdf(storagePaths, id)) || snapshotForRestore;
-  }
-  if (needsPdfRestore && snapshotForPdf?.payload) {
-    snapshotForRestore = snapshotForPdf;
-    payload =
-      snapshotForRestore.payload && typeof snapshotForRestore.payload === 'object'
-        ? snapshotForRestore.payload
-        : payload;
-  }
-  if (needsPdfRestore && snapshotForPdf.pdfPath) {
+  if (sources.withPdf) {
     await fs.mkdir(path.dirname(destinationPdfPath), { recursive: true });
-    await fs.copyFile(snapshotForPdf.pdfPath, destinationPdfPath);
-    restoredFile = true;
+    restoredFile = await fs
+      .copyFile(sources.withPdf.pdfPath, destinationPdfPath, fsConstants.COPYFILE_EXCL)
+      .then(
+        () => true,
+        (error) => {
+          if (error?.code !== 'EEXIST') {
+            throw error;
+          }
+          return false;
+        },
+      );
+  }
+  if (restoredFile) {
+    snapshotForRestore = sources.withPdf;
   }
 
   const restoredDocument = normalizeDocument({
@@ -1661,7 +1752,7 @@ async function restoreDocumentFromBackup(storagePaths, documentId, options = {})
     createdAt: backupDocument?.createdAt || existingDocument?.createdAt || new Date().toISOString(),
   });
 
-  const documentIndex = db.documents.findIndex((item) => item.id === id);
+  const documentIndex = findIndexById(db, 'documents', id);
   if (documentIndex >= 0) {
     const originalCreatedAt = db.documents[documentIndex].createdAt;
     db.documents[documentIndex] = {
@@ -1748,20 +1839,19 @@ async function importDocumentFromPath(storagePaths, sourceFilePathRaw) {
   const id = await computeSha256(sourceFilePath);
   const destinationPath = path.join(storagePaths.documentsDir, `${id}.pdf`);
 
-  const db = await loadDB(storagePaths);
-  const existing = db.documents.find((doc) => doc.id === id) || null;
+  const existing = await getDocumentById(storagePaths, id);
   if (existing) {
-    const countMap = buildHighlightsCountMap(db.highlights);
-    const bookmarkMap = buildBookmarksCountMap(db.bookmarks);
     return {
       alreadyExists: true,
-      document: enrichDocument(existing, countMap, bookmarkMap),
+      document: existing,
     };
   }
 
-  if (!(await fileExists(destinationPath))) {
-    await fs.copyFile(sourceFilePath, destinationPath);
-  }
+  await fs.copyFile(sourceFilePath, destinationPath, fsConstants.COPYFILE_EXCL).catch((error) => {
+    if (error?.code !== 'EEXIST') {
+      throw error;
+    }
+  });
 
   const title = path.basename(sourceFilePath, path.extname(sourceFilePath));
 
@@ -1781,13 +1871,14 @@ async function importDocumentFromPath(storagePaths, sourceFilePathRaw) {
     collectionId: undefined,
   });
 
+  const db = await loadDB(storagePaths);
   db.documents.push(document);
   await writeDocumentBackupSafe(storagePaths, db, document.id, 'after-import');
   await saveDB(storagePaths, db);
 
   return {
     alreadyExists: false,
-    document: enrichDocument(document, buildHighlightsCountMap(db.highlights), buildBookmarksCountMap(db.bookmarks)),
+    document: await getDocumentById(storagePaths, document.id),
   };
 }
 
@@ -1862,4 +1953,7 @@ module.exports = {
   importDocumentFromPath,
   importDocumentsFromPaths,
   getStoragePaths,
+  __private: {
+    findIndexById,
+  },
 };
@@ -95,6 +95,7 @@ const STOP_WORDS = new Set([
   'our',
   'its',
 ]);
+const STOP_WORD_MAX_LENGTH = Math.max(...[...STOP_WORDS].map((word) => word.length));
 
 function normalizeInlineText(value) {
   return String(value ?? '')
@@ -268,10 +269,16 @@ function tokenize(value) {
     return [];
   }
 
-  return tokens
-    .map((token) => stemToken(token))
-    .map((token) => token.replace(/^[^\p{L}\p{N}]+|[^\p{L}\p{N}]+$/gu, ''))
-    .filter((token) => token.length > 1 && !STOP_WORDS.has(token));
+  // Matched tokens are already letters and digits only, so stemming is the
+  // only transform left before filtering.
+  const result = [];
+  for (const token of tokens) {
+    const stem = stemToken(token);
+    if (stem.length > 1 && (stem.length > STOP_WORD_MAX_LENGTH || !STOP_WORDS.has(stem))) {
+      result.push(stem);
+    }
+  }
+  return result;
 }
 
 function buildTokenVector(value) {
@@ -623,9 +630,12 @@ function buildLocalPlan(payload, maxActions) {
   }
 
   if (payload.documentProfiles.length > 0) {
-    const weakest = payload.documentProfiles
-      .filter((item) => item.progress.totalPages > 0)
-      .sort((left, right) => left.progress.percent - right.progress.percent)[0];
+    let weakest = null;
+    for (const item of payload.documentProfiles) {
+      if (item.progress.totalPages > 0 && (!weakest || item.progress.percent < weakest.progress.percent)) {
+        weakest = item;
+      }
+    }
     if (weakest) {
       recommendations.push(`Подтянуть отстающий документ: ${truncateText(weakest.title, 60)} (${weakest.progress.percent}%).`);
     }
@@ -104,16 +104,23 @@ function clampInt(value, fallback, min = 0, max = Number.MAX_SAFE_INTEGER) {
   return Math.min(max, Math.max(min, Math.trunc(number)));
 }
 
-function tokenize(value) {
-  const tokens = String(value ?? '')
-    .toLowerCase()
-    .match(/[\p{L}\p{N}]{2,}/gu);
-
-  if (!tokens) {
-    return [];
+const TOKEN_PATTERN = /[\p{L}\p{N}]{2,}/gu;
+const STOP_WORD_MAX_LENGTH = Math.max(...[...STOP_WORDS].map((word) => word.length));
+const GRAPH_KEYWORDS_PER_HIGHLIGHT = 3;
+const graphKeywordsByHighlight = new WeakMap();
+
+function forEachToken(value, visit) {
+  for (const [token] of String(value ?? '').toLowerCase().matchAll(TOKEN_PATTERN)) {
+    if (token.length > STOP_WORD_MAX_LENGTH || !STOP_WORDS.has(token)) {
+      visit(token);
+    }
   }
+}
 
-  return tokens.filter((token) => !STOP_WORDS.has(token));
+function tokenize(value) {
+  const tokens = [];
+  forEachToken(value, (token) => tokens.push(token));
+  return tokens;
 }
 
 function tokenizeSet(value) {
@@ -185,11 +192,13 @@ function filterHighlights(db, options = {}) {
 }
 
 function pickClozeToken(text) {
-  const candidates = [...new Set(tokenize(text))]
-    .filter((token) => token.length >= 5)
-    .sort((left, right) => right.length - left.length);
-
-  return candidates[0] || '';
+  let longest = '';
+  for (const token of tokenize(text)) {
+    if (token.length >= 5 && token.length > longest.length) {
+      longest = token;
+    }
+  }
+  return longest;
 }
 
 function buildCloze(text) {
@@ -291,25 +300,32 @@ function generateSrsDeck(db, options = {}) {
     return isDueForReview(highlight, nowTs);
   });
 
-  const sorted = [...candidates].sort((left, right) => {
-    const leftDue = isDueForReview(left, nowTs) ? 0 : 1;
-    const rightDue = isDueForReview(right, nowTs) ? 0 : 1;
-    if (leftDue !== rightDue) {
-      return leftDue - rightDue;
+  const dueFlags = new Uint8Array(candidates.length);
+  const reviewCounts = new Float64Array(candidates.length);
+  const createdTimestamps = new Float64Array(candidates.length);
+  let dueCount = 0;
+  let newCount = 0;
+  candidates.forEach((highlight, index) => {
+    dueFlags[index] = isDueForReview(highlight, nowTs) ? 1 : 0;
+    reviewCounts[index] = clampInt(highlight.reviewCount, 0);
+    createdTimestamps[index] = new Date(highlight.createdAt || 0).valueOf();
+    dueCount += dueFlags[index];
+    if (!toIsoOrNull(highlight.nextReviewAt)) {
+      newCount += 1;
     }
-
-    const leftReviewCount = clampInt(left.reviewCount, 0);
-    const rightReviewCount = clampInt(right.reviewCount, 0);
-    if (leftReviewCount !== rightReviewCount) {
-      return leftReviewCount - rightReviewCount;
-    }
-
-    const leftCreated = new Date(left.createdAt || 0).valueOf();
-    const rightCreated = new Date(right.createdAt || 0).valueOf();
-    return leftCreated - rightCreated;
   });
 
-  const cards = sorted.slice(0, limit).map((highlight) => {
+  const order = candidates
+    .map((_highlight, index) => index)
+    .sort(
+      (left, right) =>
+        dueFlags[right] - dueFlags[left] ||
+        reviewCounts[left] - reviewCounts[right] ||
+        createdTimestamps[left] - createdTimestamps[right],
+    );
+
+  const cards = order.slice(0, limit).map((index) => {
+    const highlight = candidates[index];
     const document = documentMap.get(String(highlight.documentId));
     const documentTitle =
       normalizeInlineText(document?.title) ||
@@ -356,9 +372,6 @@ function generateSrsDeck(db, options = {}) {
       ? `SRS · ${[...uniqueDocumentTitles][0]}`
       : `SRS · Recall Library · ${nowIso.slice(0, 10)}`;
 
-  const dueCount = candidates.filter((highlight) => isDueForReview(highlight, nowTs)).length;
-  const newCount = candidates.filter((highlight) => !toIsoOrNull(highlight.nextReviewAt)).length;
-
   return {
     generatedAt: nowIso,
     dueOnly,
@@ -587,16 +600,19 @@ function buildReadingDigest(db, options = {}) {
   };
 }
 
-function buildTokenFrequency(values) {
+function buildTokenFrequency(values, forEachValueToken = forEachToken) {
   const frequency = new Map();
+  const countToken = (token) => frequency.set(token, (frequency.get(token) || 0) + 1);
   for (const value of values) {
-    for (const token of tokenize(value)) {
-      frequency.set(token, (frequency.get(token) || 0) + 1);
-    }
+    forEachValueToken(value, countToken);
   }
   return frequency;
 }
 
+function buildTokenListFrequency(tokenLists) {
+  return buildTokenFrequency(tokenLists, (tokens, visit) => tokens.forEach((token) => visit(token)));
+}
+
 function pickTopKeywords(text, limit = 3) {
   const frequency = buildTokenFrequency([text]);
   return [...frequency.entries()]
@@ -610,6 +626,21 @@ function pickTopKeywords(text, limit = 3) {
     .map(([token]) => token);
 }
 
+// Frozen highlights (storage snapshot records) cannot change, so their graph
+// keywords are kept per record and released together with the snapshot.
+function pickHighlightGraphKeywords(highlight) {
+  if (!Object.isFrozen(highlight)) {
+    return pickTopKeywords(cleanHighlightText(highlight), GRAPH_KEYWORDS_PER_HIGHLIGHT);
+  }
+
+  let keywords = graphKeywordsByHighlight.get(highlight);
+  if (!keywords) {
+    keywords = pickTopKeywords(cleanHighlightText(highlight), GRAPH_KEYWORDS_PER_HIGHLIGHT);
+    graphKeywordsByHighlight.set(highlight, keywords);
+  }
+  return keywords;
+}
+
 function slugNodeId(value) {
   const normalized = String(value ?? '')
     .toLowerCase()
@@ -644,8 +675,7 @@ function buildKnowledgeGraph(db, options = {}) {
       }
     }
 
-    const sourceText = cleanHighlightText(highlight);
-    for (const keyword of pickTopKeywords(sourceText, 3)) {
+    for (const keyword of pickHighlightGraphKeywords(highlight)) {
       concepts.add(keyword);
     }
 
@@ -774,7 +804,7 @@ function buildKnowledgeGraph(db, options = {}) {
   };
 }
 
-function scoreHighlightByQuery(highlight, queryText, queryTokens) {
+function scoreHighlightByQuery(highlight, queryLower, queryTokens, nowTs) {
   const text = cleanHighlightText(highlight);
   const note = normalizeInlineText(highlight.note || '');
   const tags = Array.isArray(highlight.tags) ? highlight.tags.join(' ') : '';
@@ -789,13 +819,13 @@ function scoreHighlightByQuery(highlight, queryText, queryTokens) {
     }
   }
 
-  const phraseBoost = mergedLower.includes(queryText.toLowerCase()) ? 0.8 : 0;
+  const phraseBoost = mergedLower.includes(queryLower) ? 0.8 : 0;
   const overlapRatio = queryTokens.length > 0 ? overlap / queryTokens.length : 0;
   const noteBoost = note ? 0.12 : 0;
   const tagBoost = Array.isArray(highlight.tags) && highlight.tags.length > 0 ? 0.08 : 0;
   const recencyBoost = Math.max(
     0,
-    0.25 - (Date.now() - new Date(toIsoOrNull(highlight.createdAt) || 0).valueOf()) / (1000 * 60 * 60 * 24 * 200),
+    0.25 - (nowTs - new Date(toIsoOrNull(highlight.createdAt) || 0).valueOf()) / (1000 * 60 * 60 * 24 * 200),
   );
 
   return overlapRatio * 2.4 + phraseBoost + noteBoost + tagBoost + recencyBoost;
@@ -813,11 +843,13 @@ function askLibrary(db, options = {}) {
     documentIds: Array.isArray(options.documentIds) ? options.documentIds : undefined,
   });
 
+  const queryLower = query.toLowerCase();
   const queryTokens = tokenize(query);
+  const nowTs = Date.now();
   const scored = highlights
     .map((highlight) => ({
       highlight,
-      score: scoreHighlightByQuery(highlight, query, queryTokens),
+      score: scoreHighlightByQuery(highlight, queryLower, queryTokens, nowTs),
     }))
     .filter((item) => item.score > 0)
     .sort((left, right) => right.score - left.score)
@@ -943,11 +975,12 @@ function summarizeHighlights(db, options = {}) {
     }
   }
 
-  const frequency = buildTokenFrequency(allSentences.map((item) => item.sentence));
+  const sentenceTokens = allSentences.map((item) => tokenize(item.sentence));
+  const frequency = buildTokenListFrequency(sentenceTokens);
 
   const scoredSentences = allSentences
     .map((item, index) => {
-      const tokens = tokenize(item.sentence);
+      const tokens = sentenceTokens[index];
       const score = tokens.reduce((sum, token) => sum + (frequency.get(token) || 0), 0) /
         Math.max(4, tokens.length);
       return {
@@ -1,3 +1,5 @@
+'use strict';
+
 const fs = require('node:fs/promises');
 const fsSync = require('node:fs');
 const path = require('node:path');
@@ -664,6 +666,31 @@ function filterBundleDocuments(documents, documentIds) {
   return documents.filter((document) => allowed.has(String(document.id)));
 }
 
+// Bundle insights are the slow part of an export, so handlers build them only
+// after the user has picked a destination folder.
+function buildBundleInsights(db, documentIds) {
+  return {
+    srsDeck: generateSrsDeck(db, {
+      documentIds,
+      dueOnly: false,
+      limit: 800,
+    }),
+    dailyDigest: buildReadingDigest(db, {
+      period: 'daily',
+      documentIds,
+    }),
+    weeklyDigest: buildReadingDigest(db, {
+      period: 'weekly',
+      documentIds,
+    }),
+    graph: buildKnowledgeGraph(db, {
+      documentIds,
+      topConcepts: 96,
+      minEdgeWeight: 2,
+    }),
+  };
+}
+
 function registerIpc() {
   registerTrustedIpcHandle(IPC_CHANNELS.LIBRARY_LIST_DOCUMENTS, async () => {
     return listDocuments(storagePaths);
@@ -1047,34 +1074,6 @@ function registerIpc() {
     const documentIdSet = new Set(documents.map((item) => item.id));
     const highlights = db.highlights.filter((item) => documentIdSet.has(item.documentId));
 
-    const srsDeck = generateSrsDeck(db, {
-      documentIds: [...documentIdSet],
-      dueOnly: false,
-      limit: 800,
-    });
-    const dailyDigest = buildReadingDigest(db, {
-      period: 'daily',
-      documentIds: [...documentIdSet],
-    });
-    const weeklyDigest = buildReadingDigest(db, {
-      period: 'weekly',
-      documentIds: [...documentIdSet],
-    });
-    const graph = buildKnowledgeGraph(db, {
-      documentIds: [...documentIdSet],
-      topConcepts: 96,
-      minEdgeWeight: 2,
-    });
-
-    const files = buildObsidianBundleFiles({
-      documents,
-      highlights,
-      srsDeck,
-      dailyDigest,
-      weeklyDigest,
-      graph,
-    });
-
     const pick = await dialog.showOpenDialog({
       title: 'Выберите папку для Obsidian bundle',
       properties: ['openDirectory', 'createDirectory'],
@@ -1083,6 +1082,12 @@ function registerIpc() {
       return { canceled: true };
     }
 
+    const files = buildObsidianBundleFiles({
+      documents,
+      highlights,
+      ...buildBundleInsights(db, [...documentIdSet]),
+    });
+
     const written = await writeBundleFiles(
       pick.filePaths[0],
       `recall-obsidian-bundle-${timestampForFile()}`,
@@ -1108,34 +1113,6 @@ function registerIpc() {
     const documentIdSet = new Set(documents.map((item) => item.id));
     const highlights = db.highlights.filter((item) => documentIdSet.has(item.documentId));
 
-    const srsDeck = generateSrsDeck(db, {
-      documentIds: [...documentIdSet],
-      dueOnly: false,
-      limit: 800,
-    });
-    const dailyDigest = buildReadingDigest(db, {
-      period: 'daily',
-      documentIds: [...documentIdSet],
-    });
-    const weeklyDigest = buildReadingDigest(db, {
-      period: 'weekly',
-      documentIds: [...documentIdSet],
-    });
-    const graph = buildKnowledgeGraph(db, {
-      documentIds: [...documentIdSet],
-      topConcepts: 96,
-      minEdgeWeight: 2,
-    });
-
-    const files = buildNotionBundleFiles({
-      documents,
-      highlights,
-      srsDeck,
-      dailyDigest,
-      weeklyDigest,
-      graph,
-    });
-
     const pick = await dialog.showOpenDialog({
       title: 'Выберите папку для Notion bundle',
       properties: ['openDirectory', 'createDirectory'],
@@ -1144,6 +1121,12 @@ function registerIpc() {
       return { canceled: true };
     }
 
+    const files = buildNotionBundleFiles({
+      documents,
+      highlights,
+      ...buildBundleInsights(db, [...documentIdSet]),
+    });
+
     const written = await writeBundleFiles(
       pick.filePaths[0],
       `recall-notion-bundle-${timestampForFile()}`,
@@ -1193,8 +1176,7 @@ function registerIpc() {
 
   registerTrustedIpcHandle(IPC_CHANNELS.INSIGHTS_REVIEW_HIGHLIGHT, async (_event, payload) => {
     const validated = validateChannelPayload(IPC_CHANNELS.INSIGHTS_REVIEW_HIGHLIGHT, payload || {});
-    const db = await loadDB(storagePaths);
-    const highlight = db.highlights.find((item) => item.id === validated.highlightId);
+    const [highlight] = await listAllHighlights(storagePaths, { ids: [validated.highlightId] });
     if (!highlight) {
       throw new Error('Хайлайт для review не найден.');
     }
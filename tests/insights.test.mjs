@@ -96,6 +96,29 @@ describe('insights module', () => {
     expect(answer.answer).toContain('Ключевые тезисы');
   });
 
+  it('keeps graph keywords of frozen highlights in line with record replacements', () => {
+    const options = { topConcepts: 30, minEdgeWeight: 1 };
+    const mutableDb = makeDb();
+    mutableDb.highlights = mutableDb.highlights.map((highlight) => ({ ...highlight, tags: [] }));
+    const frozenDb = {
+      ...mutableDb,
+      highlights: mutableDb.highlights.map((highlight) => Object.freeze({ ...highlight })),
+    };
+
+    expect(buildKnowledgeGraph(frozenDb, options).nodes).toEqual(buildKnowledgeGraph(mutableDb, options).nodes);
+    expect(buildKnowledgeGraph(frozenDb, options).nodes).toEqual(buildKnowledgeGraph(mutableDb, options).nodes);
+
+    frozenDb.highlights[2] = Object.freeze({
+      ...frozenDb.highlights[2],
+      selectedText: 'Пустыня реального расширяется, пустыня остаётся.',
+    });
+    const labels = buildKnowledgeGraph(frozenDb, options)
+      .nodes.filter((node) => node.kind === 'concept')
+      .map((node) => node.label);
+    expect(labels).toContain('пустыня');
+    expect(labels).not.toContain('технологический');
+  });
+
   it('creates extractive summary for selected document', () => {
     const summary = summarizeHighlights(makeDb(), {
       documentId: 'doc-1',
@@ -31,12 +31,14 @@ const {
   deleteBookmark,
   deleteBookmarksByIds,
   createCollection,
+  listCollections,
   updateCollection,
   deleteCollection,
   getReadingOverview,
   getStoragePaths,
   deleteDocument,
   restoreDocumentFromBackup,
+  __private: { findIndexById },
 } = storageModule;
 
 function makeHighlight(documentId, patch = {}) {
@@ -111,6 +113,107 @@ describe('storage module', () => {
     expect(files.some((name) => name.startsWith('db.json.corrupt.'))).toBe(true);
   });
 
+  it('returns isolated db copies and picks up external db.json edits', async () => {
+    const first = await loadDB(storagePaths);
+    first.documents.push({ id: 'leak', title: 'Leak', filePath: '/tmp/leak.pdf' });
+    expect((await loadDB(storagePaths)).documents).toEqual([]);
+
+    const raw = JSON.parse(await fs.readFile(storagePaths.dbPath, 'utf8'));
+    raw.documents.push({ id: 'external', title: 'External', filePath: '/tmp/external.pdf' });
+    await fs.writeFile(storagePaths.dbPath, JSON.stringify(raw), 'utf8');
+
+    const docs = await listDocuments(storagePaths);
+    expect(docs.map((doc) => doc.id)).toEqual(['external']);
+    expect(docs[0].highlightsCount).toBe(0);
+  });
+
+  it('rejects in-place record edits and re-normalizes replaced records on save', async () => {
+    await upsertDocument(storagePaths, { id: 'doc-1', title: 'Original', filePath: '/tmp/doc-1.pdf' });
+    const db = await loadDB(storagePaths);
+
+    expect(() => {
+      db.documents[0].title = 'Renamed';
+    }).toThrow(TypeError);
+
+    db.documents[0] = { ...db.documents[0], title: '  Renamed \n title  ' };
+    await saveDB(storagePaths, db);
+
+    expect((await getDocumentById(storagePaths, 'doc-1')).title).toBe('Renamed title');
+  });
+
+  it('freezes private copies of saved records and reading log entries', async () => {
+    const source = { origin: 'import' };
+    await upsertDocument(storagePaths, { id: 'doc-1', title: 'Doc', filePath: '/tmp/doc-1.pdf', source });
+    expect(Object.isFrozen(source)).toBe(false);
+
+    const db = await loadDB(storagePaths);
+    expect(db.documents[0].source).toEqual({ origin: 'import' });
+    expect(Object.isFrozen(db.documents[0].source)).toBe(true);
+
+    db.readingLog['2026-02-20'] = { pages: 3, seconds: 60 };
+    await saveDB(storagePaths, db);
+
+    const reloaded = await loadDB(storagePaths);
+    expect(() => {
+      reloaded.readingLog['2026-02-20'].pages += 1;
+    }).toThrow(TypeError);
+    expect((await loadDB(storagePaths)).readingLog['2026-02-20']).toEqual({ pages: 3, seconds: 60 });
+  });
+
+  it('skips rewriting db.json when a save does not change anything', async () => {
+    await updateSettings(storagePaths, { goals: { pagesPerDay: 9, pagesPerWeek: 30 } });
+    const before = await fs.stat(storagePaths.dbPath, { bigint: true });
+
+    await saveDB(storagePaths, await loadDB(storagePaths));
+    await updateSettings(storagePaths, { goals: { pagesPerDay: 9 } });
+
+    const after = await fs.stat(storagePaths.dbPath, { bigint: true });
+    expect(after.ino).toBe(before.ino);
+    expect(after.mtimeNs).toBe(before.mtimeNs);
+    expect((await getSettings(storagePaths)).goals.pagesPerWeek).toBe(30);
+  });
+
+  it('keeps reads in line with db.json after overlapping saves', async () => {
+    for (let round = 0; round < 5; round += 1) {
+      const unchanged = await loadDB(storagePaths);
+      const [left, right] = await Promise.all([loadDB(storagePaths), loadDB(storagePaths)]);
+      left.collections.push({ id: `left-${round}`, name: 'Left', createdAt: '2026-02-19T12:00:00.000Z' });
+      right.collections.push({ id: `right-${round}`, name: 'Right', createdAt: '2026-02-19T12:00:00.000Z' });
+
+      await Promise.all([
+        saveDB(storagePaths, left),
+        saveDB(storagePaths, right),
+        saveDB(storagePaths, unchanged),
+      ]);
+
+      const onDisk = JSON.parse(await fs.readFile(storagePaths.dbPath, 'utf8'));
+      const listed = await listCollections(storagePaths);
+      expect(listed.map((item) => item.id)).toEqual(onDisk.collections.map((item) => item.id));
+    }
+  });
+
+  it('finds records by id after loaded collections are reshaped', async () => {
+    for (const id of ['doc-a', 'doc-b', 'doc-c']) {
+      await upsertDocument(storagePaths, { id, title: id, filePath: `/tmp/${id}.pdf` });
+    }
+
+    const spliced = await loadDB(storagePaths);
+    spliced.documents.splice(0, 1);
+    expect(findIndexById(spliced, 'documents', 'doc-a')).toBe(-1);
+    expect(findIndexById(spliced, 'documents', 'doc-b')).toBe(0);
+    expect(findIndexById(spliced, 'documents', 'doc-c')).toBe(1);
+
+    const filtered = await loadDB(storagePaths);
+    filtered.documents = filtered.documents.filter((doc) => doc.id !== 'doc-b');
+    expect(findIndexById(filtered, 'documents', 'doc-b')).toBe(-1);
+    expect(findIndexById(filtered, 'documents', 'doc-c')).toBe(1);
+
+    const pushed = await loadDB(storagePaths);
+    pushed.documents.push({ id: 'doc-d', title: 'doc-d', filePath: '/tmp/doc-d.pdf' });
+    expect(findIndexById(pushed, 'documents', 'doc-d')).toBe(3);
+    expect(findIndexById(pushed, 'documents', 'doc-a')).toBe(0);
+  });
+
   it('imports documents, deduplicates by sha256 and sorts pinned first', async () => {
     const sourceA = path.join(tempRoot, 'Book A.pdf');
     const sourceB = path.join(tempRoot, 'Book B.pdf');
@@ -251,6 +354,21 @@ describe('storage module', () => {
     expect(noOpDelete.deleted).toBe(false);
   });
 
+  it('backs up every affected document on bulk highlight deletes', async () => {
+    const documentIds = Array.from({ length: 7 }, (_, index) => `bulk-${index}`);
+    const highlightIds = [];
+    for (const id of documentIds) {
+      await upsertDocument(storagePaths, { id, title: id, filePath: `/tmp/${id}.pdf` });
+      highlightIds.push((await addHighlight(storagePaths, makeHighlight(id))).id);
+    }
+
+    const result = await deleteHighlightsByIds(storagePaths, highlightIds);
+    expect(result.deletedCount).toBe(documentIds.length);
+
+    const backedUp = await fs.readdir(path.join(storagePaths.backupDir, 'documents'));
+    expect(backedUp.sort()).toEqual([...documentIds].sort());
+  });
+
   it('handles collections, bookmarks and keeps highlights after deleteDocument', async () => {
     const source = path.join(tempRoot, 'Cascade Book.pdf');
     await fs.writeFile(source, 'pdf-cascade');
@@ -344,6 +462,51 @@ describe('storage module', () => {
     expect(restoredDoc.bookmarksCount).toBe(1);
   });
 
+  it('restores the PDF from the newest backup that has one', async () => {
+    const id = 'backup-doc';
+    const backupDir = path.join(storagePaths.backupDir, 'documents', id);
+    await fs.mkdir(backupDir, { recursive: true });
+    const writeSnapshot = (baseName, document, highlights) =>
+      fs.writeFile(
+        path.join(backupDir, `${baseName}.json`),
+        JSON.stringify({ version: 1, documentId: id, document, highlights, bookmarks: [] }),
+      );
+    const document = { id, filePath: path.join(storagePaths.documentsDir, `${id}.pdf`) };
+
+    await writeSnapshot('1000-older', { ...document, title: 'Older Title' }, [makeHighlight(id)]);
+    await fs.writeFile(path.join(backupDir, '1000-older.pdf'), 'pdf-older');
+    await writeSnapshot('2000-newer', { ...document, title: 'Newer Title' }, []);
+
+    const restored = await restoreDocumentFromBackup(storagePaths, id);
+    expect(restored.restored).toBe(true);
+    expect(restored.restoredFile).toBe(true);
+    expect(path.basename(restored.backupPath)).toBe('1000-older.json');
+    expect(restored.document.title).toBe('Newer Title');
+    expect(restored.restoredHighlightsCount).toBe(1);
+    expect(await fs.readFile(document.filePath, 'utf8')).toBe('pdf-older');
+  });
+
+  it('keeps existing db.json and PDF files instead of overwriting them', async () => {
+    await upsertDocument(storagePaths, { id: 'kept-doc', title: 'Kept', filePath: '/tmp/kept-doc.pdf' });
+    await ensureStorage(tempRoot);
+    expect((await loadDB(storagePaths)).documents.map((doc) => doc.id)).toEqual(['kept-doc']);
+
+    const id = 'existing-pdf';
+    const destination = path.join(storagePaths.documentsDir, `${id}.pdf`);
+    const backupDir = path.join(storagePaths.backupDir, 'documents', id);
+    await fs.mkdir(backupDir, { recursive: true });
+    await fs.writeFile(
+      path.join(backupDir, '1000-snapshot.json'),
+      JSON.stringify({ version: 1, documentId: id, document: { id, title: 'Existing', filePath: destination } }),
+    );
+    await fs.writeFile(path.join(backupDir, '1000-snapshot.pdf'), 'pdf-backup');
+    await fs.writeFile(destination, 'pdf-current');
+
+    const restored = await restoreDocumentFromBackup(storagePaths, id);
+    expect(restored.restoredFile).toBe(false);
+    expect(await fs.readFile(destination, 'utf8')).toBe('pdf-current');
+  });
+
   it('updates collection names, reading overview and exposed paths', async () => {
     const source = path.join(tempRoot, 'Overview Book.pdf');
     await fs.writeFile(source, 'pdf-overview');